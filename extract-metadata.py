@@ -1,32 +1,158 @@
+import csv
+import os
+import pickle
+import sqlite3
 import re
+import unicodedata
+
+import ahocorasick
+import xlsxwriter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Optional, Dict, List
 from pathlib import Path
-import PyPDF2
+import numpy as np
+import pypdfium2 as pdfium
 import pandas as pd
-from difflib import SequenceMatcher
+from rapidfuzz import process
+from rapidfuzz.distance import JaroWinkler
 from datetime import datetime
 
 # ===== 配置 =====
 JOURNAL_DATABASE_PATH = "2025JCRIMPACTFACTORSDETAILED.xlsx"  # 修改为实际路径
 PDF_DIRECTORY = "./papers"                                   # 修改为PDF文件所在目录
 OUTPUT_FILE = "parse-results.xlsx"                           # 修改为输出的文件（文件地址+文件名）
+CACHE_DB_PATH = "cache.db"                                   # 提取结果缓存，提取逻辑改动后删掉即可
 TREAT_MODE = "path"                                          # 可选single（单一文件、用于测试）和path（文件夹路径，生产）
 
+# ===== 预编译正则 =====
+# 热循环里反复re.search会每次查re的缓存甚至重新编译，统一在模块加载时编译好
+# subject字段的几种格式（逗号分隔/doi前缀/年份后缀）合成一条正则，一遍走完
+_SUBJECT_RE = re.compile(
+    r'^[^\w]*([A-Za-z][^,]*?)(?:\s*,|\s*doi:|\s+(?:19|20)\d{2}|$)',
+    re.IGNORECASE
+)
+_SUBJECT_TRAIL_RE = re.compile(r'\s*[\d,.:\-]+\s*$')
+# 四种常见期刊名写法合成一条带命名组的alternation，正则引擎对文本只走一遍
+_JOURNAL_COMBO_RE = re.compile(
+    r'Published in:?\s*(?P<pub>[A-Z][A-Za-z\s&\-:]+?)(?=\n|,|Vol|\d{4})'
+    r'|(?P<vol>[A-Z][A-Za-z\s&\-:]+?)\s+Vol\.\s*\d+'
+    r'|Journal:\s*(?P<jr>[A-Z][A-Za-z\s&\-:]+)'
+    r'|©.*?(?P<cop>\b[A-Z][A-Za-z\s&\-:]+?)\s+\d{4}'  # 版权声明中的期刊名
+)
+
+_CACHE_COLUMNS = ['journal_name', 'impact_factor', 'journal_name_norm']
+
+
+def _norm(s: str) -> str:
+    """
+    统一归一化：NFKC展开连字/全角字符（PDF文本里ﬁ这类连字很常见），
+    casefold统一大小写。两边都归一化后，比较就是纯字节级的事了
+
+    Args:
+        s: 原始字符串
+
+    Returns:
+        归一化后的字符串
+    """
+    # 绝大多数期刊名是纯ASCII，NFKC对它们是恒等变换，
+    # 走isascii+lower的C快路径就够了
+    if s.isascii():
+        return s.lower().strip()
+    return unicodedata.normalize('NFKC', s).casefold().strip()
+
+
+# 查询索引绝对不能放进df.attrs：pandas取行/取列时会通过__finalize__把attrs
+# 整个deepcopy到返回对象上，每次df.iloc都要拷贝全部索引，越查越慢还爆内存。
+# 放模块级缓存，按DataFrame身份惰性构建
+_journal_index = None
+
+
+def _build_indexes(df: pd.DataFrame) -> Dict:
+    """
+    为期刊DataFrame构建各种查询结构（纯python对象，不碰df本身）
+
+    Args:
+        df: 已清洗好的期刊DataFrame
+
+    Returns:
+        索引字典
+    """
+    # 预先取出list，让rapidfuzz一次性在C层面批量比较，避免逐行调python函数；
+    # 结果列也抽成list，命中后直接按下标取值，不走pandas的行访问
+    names_list = df['journal_name_norm'].tolist()
+    index = {
+        'df': df,
+        'names_list': names_list,
+        'journal_names': df['journal_name'].tolist(),
+        'impact_factors': df['impact_factor'].tolist(),
+    }
+    # 精确匹配用dict做O(1)查找，省掉每次查询扫全列的布尔mask。
+    # 表里偶有重名（不同版块的JIF），和原来布尔索引取iloc[0]一致，保留第一条
+    exact_map = {}
+    for i, n in enumerate(names_list):
+        exact_map.setdefault(n, i)
+    index['exact_map'] = exact_map
+    # 各期刊名长度，供模糊匹配前的长度预筛选用
+    index['names_lens'] = np.array([len(n) for n in names_list])
+    # Aho-Corasick自动机：一遍扫描就能在文本里同时找全部期刊名。
+    # 太短的名字（如Gut）当普通单词出现得太频繁，不进自动机，走常规流程
+    automaton = ahocorasick.Automaton()
+    for name, i in exact_map.items():
+        if len(name) >= 4:
+            automaton.add_word(name, (len(name), i))
+    automaton.make_automaton()
+    index['automaton'] = automaton
+    return index
+
+
+def _get_indexes(df: pd.DataFrame) -> Dict:
+    """
+    取得df对应的查询索引，还没建或df换了就（重）建
+
+    Args:
+        df: 期刊数据库DataFrame
+
+    Returns:
+        索引字典
+    """
+    global _journal_index
+    if _journal_index is None or _journal_index['df'] is not df:
+        _journal_index = _build_indexes(df)
+    return _journal_index
+
+
 # noinspection PyTypeChecker
 def load_journal_database(file_path: str = JOURNAL_DATABASE_PATH) -> pd.DataFrame:
     """
     加载期刊影响因子数据库
 
+    xlsx本质是打包的XML，parse一次要好几秒；第一次加载后把清洗好的表
+    缓存成parquet，之后（包括每个子进程）都走毫秒级的二进制读取。
+    xlsx更新（mtime变新）或缓存列对不上时自动重建
+
     Args:
         file_path: xlsx文件路径
 
     Returns:
         包含期刊信息的DataFrame
     """
+    xlsx_path = Path(file_path)
+    cache_path = xlsx_path.with_suffix('.cache.parquet')
+
+    if cache_path.exists() and cache_path.stat().st_mtime >= xlsx_path.stat().st_mtime:
+        df = pd.read_parquet(cache_path)
+        if list(df.columns) == _CACHE_COLUMNS:
+            _get_indexes(df)
+            return df
+        # 列对不上说明是旧版程序留下的缓存，废弃重建
+
     df = pd.read_excel(file_path, usecols=('Journal Name', 'JIF'))  # 按照期刊名和影响因子提取。
     # 不知道为什么，pandas手册上写usecols能接受tuple，但我用tuple就会被IDE骂 (╯▔皿▔)╯
     df.columns = ['journal_name', 'impact_factor']  # 重命名列
-    df['journal_name_lower'] = df['journal_name'].str.lower().str.strip()
+    # arrow后端的string列是连续UTF-8 buffer，比两万个python str对象省内存得多
+    df['journal_name_norm'] = df['journal_name'].map(_norm).astype('string[pyarrow]')
+    df.to_parquet(cache_path)
+    _get_indexes(df)
     return df
 
 
@@ -34,14 +160,17 @@ def calculate_similarity(str1: str, str2: str) -> float:
     """
     计算两个字符串的相似度
 
+    注意：不在内部做归一化，调用方传入已经_norm过的字符串，
+    避免热路径上每次比较都重新分配新字符串
+
     Args:
-        str1: 字符串1
-        str2: 字符串2
+        str1: 字符串1（已归一化）
+        str2: 字符串2（已归一化）
 
     Returns:
         相似度分数 (0-1)
     """
-    return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
+    return JaroWinkler.normalized_similarity(str1, str2)
 
 
 def get_impact_factor(journal_name: str, df: pd.DataFrame,
@@ -57,73 +186,126 @@ def get_impact_factor(journal_name: str, df: pd.DataFrame,
     Returns:
         影响因子信息字典或None
     """
-    journal_name_clean = journal_name.lower().strip()
+    index = _get_indexes(df)
+    journal_name_clean = _norm(journal_name)
 
-    # 精确匹配
-    exact_match = df[df['journal_name_lower'] == journal_name_clean]
-    if not exact_match.empty:
-        row = exact_match.iloc[0]
+    # 精确匹配：O(1)哈希查找
+    exact_idx = index['exact_map'].get(journal_name_clean)
+    if exact_idx is not None:
         return {
-            'journal_name': row['journal_name'],
-            'impact_factor': row['impact_factor'],
+            'journal_name': index['journal_names'][exact_idx],
+            'impact_factor': index['impact_factors'][exact_idx],
             'match_type': 'exact'
         }
 
-    # 模糊匹配
-    df['similarity'] = df['journal_name_lower'].apply(
-        lambda x: calculate_similarity(x, journal_name_clean)
-    )
-
-    best_match = df.loc[df['similarity'].idxmax()]
-
-    if best_match['similarity'] >= threshold:
+    names_list = index['names_list']
+
+    # 长度预筛选，按Jaro-Winkler的可证上界推导：匹配数m不超过短串长度、
+    # 前缀加成取满时 JW <= 0.8 + 0.2*(短长度/长长度)，反解出长度比下限
+    # 5*threshold-4（0.85阈值下为0.25）。比值低于它的名字不可能到阈值，
+    # 筛掉不会改变任何结果，单文件路径因此和批量cdist路径严格一致
+    name_len = len(journal_name_clean)
+    min_ratio = 5 * threshold - 4
+    if min_ratio > 0 and name_len > 0:
+        lens = index['names_lens']
+        length_ratio = np.minimum(lens, name_len) / np.maximum(lens, name_len)
+        candidate_idx = np.where(length_ratio >= min_ratio)[0]
+    else:
+        candidate_idx = np.arange(len(names_list))
+
+    # 模糊匹配：extractOne在C层面扫完候选，比逐行apply快一两个数量级。
+    # 短字符串（期刊名）用Jaro-Winkler，比编辑距离更看重前缀一致，效果也更好
+    fuzzy_match = None
+    best_idx = None
+    if candidate_idx.size:
+        candidates = [names_list[i] for i in candidate_idx]
+        fuzzy_match = process.extractOne(
+            journal_name_clean, candidates,
+            scorer=JaroWinkler.normalized_similarity, score_cutoff=threshold
+        )
+        if fuzzy_match:
+            best_idx = int(candidate_idx[fuzzy_match[2]])
+
+    if fuzzy_match:
         return {
-            'journal_name': best_match['journal_name'],
-            'impact_factor': best_match['impact_factor'],
+            'journal_name': index['journal_names'][best_idx],
+            'impact_factor': index['impact_factors'][best_idx],
             'match_type': 'fuzzy',
-            'similarity': round(best_match['similarity'], 3)
+            'similarity': round(fuzzy_match[1], 3)
         }
 
     return None
 
 
-def extract_text_from_pdf(pdf_path: str, max_pages: int = 2) -> str:
+def _find_known_journal(text_head: str, journal_df: pd.DataFrame) -> Optional[int]:
     """
-    从PDF文件中提取文本（主要检查前几页）
+    用Aho-Corasick自动机在文本里直接找已知期刊名
+
+    一遍O(len(text))扫描同时匹配全部两万个期刊名；命中处要求有词边界、
+    原文大写开头（页眉/版权行里的期刊名都是Title Case，能挡掉"cells"
+    这类恰好也是期刊名的普通单词），并取最长的一个
 
     Args:
-        pdf_path: PDF文件路径
-        max_pages: 最多读取的页数
+        text_head: 文本开头部分（保留原始大小写）
+        journal_df: 期刊数据库DataFrame
 
     Returns:
-        提取的文本内容
+        命中的表行号或None
     """
-    text = ""
-    with open(pdf_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        pages_to_read = min(max_pages, len(pdf_reader.pages))
+    # 不做strip：位置要和原文对得上才能做词边界/大小写检查
+    text_lower = unicodedata.normalize('NFKC', text_head).casefold()
+    # 归一化偶尔会改变长度（连字展开等），位置对不上就放弃大小写检查
+    check_case = len(text_lower) == len(text_head)
+
+    best_idx = None
+    best_len = 0
+
+    for end_pos, (name_len, idx) in _get_indexes(journal_df)['automaton'].iter(text_lower):
+        if name_len <= best_len:
+            continue
+        start = end_pos - name_len + 1
+        if start > 0 and text_lower[start - 1].isalnum():
+            continue
+        if end_pos + 1 < len(text_lower) and text_lower[end_pos + 1].isalnum():
+            continue
+        if check_case and not text_head[start].isupper():
+            continue
+        best_len, best_idx = name_len, idx
+
+    return best_idx
+
+
+def extract_text_from_pdf(pdf: pdfium.PdfDocument, max_pages: int = 2) -> str:
+    """
+    从PdfDocument中提取文本（主要检查前几页）
 
-        for page_num in range(pages_to_read):
-            text += pdf_reader.pages[page_num].extract_text()
+    Args:
+        pdf: 已打开的PdfDocument
+        max_pages: 最多读取的页数
 
-    return text
+    Returns:
+        提取的文本内容
+    """
+    pages_to_read = min(max_pages, len(pdf))
+    return "".join(
+        pdf[page_num].get_textpage().get_text_range()
+        for page_num in range(pages_to_read)
+    )
 
 
-def extract_metadata(pdf_path: str) -> Dict[str, str]:
+def extract_metadata(pdf: pdfium.PdfDocument) -> Dict[str, str]:
     """
     提取PDF元数据（包括可能的期刊信息）
 
     Args:
-        pdf_path: PDF文件路径
+        pdf: 已打开的PdfDocument
 
     Returns:
         元数据字典
     """
-    with open(pdf_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        metadata = pdf_reader.metadata or {}
+    return {k: v for k, v in pdf.get_metadata_dict().items() if v}
+
 
-    return {k: v for k, v in metadata.items() if v}
 
 
 def extract_journal_from_subject(subject: str) -> Optional[str]:
@@ -140,39 +322,23 @@ def extract_journal_from_subject(subject: str) -> Optional[str]:
     if not subject:
         return None
 
-    # 移除首尾空白
     subject = subject.strip()
 
-    # 方法1: 提取第一个逗号之前的内容
-    # 例如: "Nature, 2023, doi:10.1038/xxx" -> "Nature"
-    if ',' in subject:
-        journal_name = subject.split(',')[0].strip()
-
-        # 验证提取的内容是否像期刊名（包含字母且不全是数字）
-        if journal_name and any(c.isalpha() for c in journal_name):
-            # 清理可能的前缀符号
-            journal_name = re.sub(r'^[^\w\s]+', '', journal_name)
-            return journal_name
+    # 一条正则同时覆盖原来的三种格式：
+    # "Nature, 2023, doi:..." / "Nature doi:..." / "Nature 2023"
+    match = _SUBJECT_RE.search(subject)
+    if not match:
+        return None
 
-    # 方法2: 如果没有逗号，尝试提取doi之前的部分
-    # 例如: "Nature doi:10.1038/xxx" -> "Nature"
-    if 'doi:' in subject.lower():
-        parts = re.split(r'\s*doi:', subject, flags=re.IGNORECASE)
-        if parts[0].strip():
-            return parts[0].strip()
+    journal_name = match.group(1).strip()
 
-    # 方法3: 如果包含年份，提取年份之前的部分
-    # 例如: "Nature 2023" -> "Nature"
-    year_match = re.search(r'^(.+?)\s+(?:19|20)\d{2}', subject)
-    if year_match:
-        return year_match.group(1).strip()
+    # 没截到任何分隔符时等于吞下整条subject，按老逻辑清理尾部数字/符号再检查长度
+    if match.end(1) >= len(subject):
+        journal_name = _SUBJECT_TRAIL_RE.sub('', journal_name).strip()
+        if len(journal_name) <= 3:
+            return None
 
-    # 如果都不匹配，返回整个subject（去除数字和特殊字符较多的部分）
-    cleaned = re.sub(r'\s*[\d,.:\-]+\s*$', '', subject).strip()
-    if cleaned and len(cleaned) > 3:
-        return cleaned
-
-    return None
+    return journal_name or None
 
 def extract_journal_name(text: str, metadata: Dict[str, str]) -> Optional[str]:
     """
@@ -186,23 +352,16 @@ def extract_journal_name(text: str, metadata: Dict[str, str]) -> Optional[str]:
         期刊名称或None
     """
     # 方法1：从元数据的Subject字段提取
-    if metadata.get('/Subject'):
-        journal_name = extract_journal_from_subject(metadata['/Subject'])
+    if metadata.get('Subject'):
+        journal_name = extract_journal_from_subject(metadata['Subject'])
         if journal_name:
             return journal_name
 
-    # 方法2：常见期刊名模式匹配
-    patterns = [
-        r'Published in:?\s*([A-Z][A-Za-z\s&\-:]+?)(?:\n|,|Vol|\d{4})',
-        r'([A-Z][A-Za-z\s&\-:]+?)\s+Vol\.\s*\d+',
-        r'Journal:\s*([A-Z][A-Za-z\s&\-:]+)',
-        r'©.*?(\b[A-Z][A-Za-z\s&\-:]+?)\s+\d{4}',  # 版权声明中的期刊名
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, text[:2000])
-        if match:
-            return match.group(1).strip()
+    # 方法2：常见期刊名模式匹配（一次搜索，看哪个命名组命中）。
+    # endpos是sre在C层面的边界，不用像切片那样先拷一份2KB出来
+    match = _JOURNAL_COMBO_RE.search(text, 0, 2000)
+    if match:
+        return match.group(match.lastgroup).strip()
 
     return None
 
@@ -228,24 +387,33 @@ def process_pdf(pdf_path: str, journal_df: pd.DataFrame = None) -> Dict[str, any
                 'message': f'加载期刊数据库失败: {str(e)}'
             }
 
-    # 提取文本和元数据
-    try:
-        text = extract_text_from_pdf(pdf_path)
-        metadata = extract_metadata(pdf_path)
-    except Exception as e:
-        return {
-            'status': 'error',
-            'message': f'读取PDF失败: {str(e)}'
-        }
+    # 提取期刊名（元数据优先，miss才读页面文本）
+    extract_result = _extract_one(pdf_path)
+    if extract_result['status'] != 'pending':
+        return extract_result
 
-    # 提取期刊名
-    journal_name = extract_journal_name(text, metadata)
+    journal_name = extract_result.get('extracted_journal_name')
+    text_head = extract_result.get('text_head')
+
+    # 首页文本里直接出现已知期刊名的话，一遍Aho-Corasick扫描就定下来
+    if text_head is not None:
+        known_idx = _find_known_journal(text_head, journal_df)
+        if known_idx is not None:
+            index = _get_indexes(journal_df)
+            return {
+                'status': 'success',
+                'extracted_journal_name': journal_name or index['journal_names'][known_idx],
+                'matched_journal_name': index['journal_names'][known_idx],
+                'impact_factor': index['impact_factors'][known_idx],
+                'match_type': 'exact',
+                'similarity': None
+            }
 
     if not journal_name:
         return {
             'status': 'error',
             'message': '未能识别期刊名称',
-            'extracted_text_preview': text[:500]  # 提供前500字符用于调试
+            'extracted_text_preview': (text_head or '')[:500]
         }
 
     # 查询影响因子
@@ -292,14 +460,183 @@ def find_all_pdfs(directory: str, recursive: bool = True) -> List[Path]:
     return sorted(pdf_files)
 
 
-def batch_process_pdfs(pdf_directory: str, journal_df: pd.DataFrame = None,
-                       recursive: bool = True) -> List[Dict]:
+def _extract_one(pdf_path: str) -> Dict:
+    """
+    阶段1 worker：只做PDF解析和期刊名提取，不查数据库
+
+    先试元数据的Subject——很多出版商会把期刊名写在里面，命中就直接
+    返回，完全跳过昂贵的页面文本提取；miss了才去解析前几页的文本
+
+    Args:
+        pdf_path: PDF文件路径
+
+    Returns:
+        提取结果字典（status为pending表示等待阶段2匹配）
+    """
+    text = ""
+    try:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            metadata = extract_metadata(pdf)
+            journal_name = extract_journal_from_subject(metadata.get('Subject'))
+            if not journal_name:
+                text = extract_text_from_pdf(pdf)
+                journal_name = extract_journal_name(text, metadata)
+        finally:
+            pdf.close()
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': f'读取PDF失败: {str(e)}'
+        }
+
+    if not journal_name and not text:
+        return {
+            'status': 'error',
+            'message': '未能识别期刊名称'
+        }
+
+    result = {'status': 'pending'}
+    if journal_name:
+        result['extracted_journal_name'] = journal_name
+    if text:
+        # 文本开头留给匹配阶段做Aho-Corasick直查，也兼作识别失败时的调试预览
+        result['text_head'] = text[:2000]
+    return result
+
+
+def _cache_key(pdf_path: str) -> str:
+    """
+    生成文件的缓存键：路径+mtime+大小，文件一有改动键就变
+
+    Args:
+        pdf_path: PDF文件路径
+
+    Returns:
+        缓存键字符串
+    """
+    st = os.stat(pdf_path)
+    return f"{pdf_path}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def _open_extract_cache(db_path: str = CACHE_DB_PATH) -> sqlite3.Connection:
+    """
+    打开（必要时创建）提取结果的sqlite缓存
+
+    Args:
+        db_path: 缓存数据库路径
+
+    Returns:
+        sqlite连接
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS extract_cache (key TEXT PRIMARY KEY, result BLOB)'
+    )
+    return conn
+
+
+def _match_batch(results: List[Dict], journal_df: pd.DataFrame,
+                 threshold: float = 0.85):
     """
-    批量处理目录下的所有PDF文件
+    阶段2：对所有pending结果一次性批量匹配影响因子（原地更新results）
+
+    精确匹配走dict，剩下的期刊名攒成一个列表，用process.cdist一次算出
+    整个 查询数×期刊数 的相似度矩阵，把每次调用的python开销摊薄到整批
+
+    Args:
+        results: 阶段1的提取结果列表
+        journal_df: 期刊数据库DataFrame
+        threshold: 相似度阈值（0-1）
+    """
+    index = _get_indexes(journal_df)
+    names_list = index['names_list']
+    exact_map = index['exact_map']
+    journal_names = index['journal_names']
+    impact_factors = index['impact_factors']
+
+    queries = []
+    fuzzy_pending = []
+
+    for result in results:
+        if result['status'] != 'pending':
+            continue
+
+        journal_name = result.get('extracted_journal_name')
+        text_head = result.pop('text_head', None)
+
+        # 首页文本里直接出现已知期刊名的话，一遍Aho-Corasick扫描就定下来，
+        # 正则提取出什么都不用再管
+        if text_head is not None:
+            known_idx = _find_known_journal(text_head, journal_df)
+            if known_idx is not None:
+                result.update({
+                    'status': 'success',
+                    'extracted_journal_name': journal_name or journal_names[known_idx],
+                    'matched_journal_name': journal_names[known_idx],
+                    'impact_factor': impact_factors[known_idx],
+                    'match_type': 'exact',
+                    'similarity': None
+                })
+                continue
+
+        if not journal_name:
+            result.update({
+                'status': 'error',
+                'message': '未能识别期刊名称',
+                'extracted_text_preview': (text_head or '')[:500]
+            })
+            continue
+
+        journal_name_clean = _norm(journal_name)
+        exact_idx = exact_map.get(journal_name_clean)
+
+        if exact_idx is not None:
+            result.update({
+                'status': 'success',
+                'matched_journal_name': journal_names[exact_idx],
+                'impact_factor': impact_factors[exact_idx],
+                'match_type': 'exact',
+                'similarity': None
+            })
+        else:
+            queries.append(journal_name_clean)
+            fuzzy_pending.append(result)
+
+    if not fuzzy_pending:
+        return
+
+    # workers=-1让rapidfuzz在内部用满所有核
+    scores = process.cdist(queries, names_list,
+                           scorer=JaroWinkler.normalized_similarity,
+                           score_cutoff=threshold, workers=-1)
+    best_indices = scores.argmax(axis=1)
+
+    for query_idx, result in enumerate(fuzzy_pending):
+        best_idx = int(best_indices[query_idx])
+        score = float(scores[query_idx, best_idx])
+
+        if score >= threshold:
+            result.update({
+                'status': 'success',
+                'matched_journal_name': journal_names[best_idx],
+                'impact_factor': impact_factors[best_idx],
+                'match_type': 'fuzzy',
+                'similarity': round(score, 3)
+            })
+        else:
+            result.update({
+                'status': 'not_found',
+                'message': '未找到匹配的期刊'
+            })
+
+
+def batch_process_pdfs(pdf_directory: str, recursive: bool = True) -> List[Dict]:
+    """
+    批量处理目录下的所有PDF文件（并行提取 + 批量匹配两阶段）
 
     Args:
         pdf_directory: PDF文件目录
-        journal_df: 期刊数据库DataFrame（可选）
         recursive: 是否递归查找子目录
 
     Returns:
@@ -313,21 +650,56 @@ def batch_process_pdfs(pdf_directory: str, journal_df: pd.DataFrame = None,
         print(f"在 {pdf_directory} 中未找到PDF文件")
         return []
 
-    print(f"找到 {total_files} 个PDF文件，开始处理...\n")
-
-    # 预加载数据库
-    if journal_df is None:
-        journal_df = load_journal_database()
-
-    batch_results = []
-
-    for idx, pdf_file in enumerate(pdf_files, 1):
-        print(f"[{idx}/{total_files}] 处理: {pdf_file.name}")
-
-        batch_result = process_pdf(str(pdf_file), journal_df)
-        batch_result['file_path'] = str(pdf_file)
-        batch_result['file_name'] = pdf_file.name
-
+    # 增量运行：没改动的文件直接取上次的提取结果，连PDF都不用碰
+    cache_conn = _open_extract_cache()
+    extracted = {}
+    to_process = []
+    for pdf_file in pdf_files:
+        cached = cache_conn.execute(
+            'SELECT result FROM extract_cache WHERE key = ?',
+            (_cache_key(str(pdf_file)),)
+        ).fetchone()
+        if cached is not None:
+            extract_result = pickle.loads(cached[0])
+            extract_result['file_path'] = str(pdf_file)
+            extract_result['file_name'] = pdf_file.name
+            extracted[str(pdf_file)] = extract_result
+        else:
+            to_process.append(pdf_file)
+
+    print(f"找到 {total_files} 个PDF文件（缓存命中 {len(extracted)} 个），开始处理...\n")
+
+    # ===== 阶段1: 并行提取期刊名 =====
+    # PDF解析是CPU密集活，多进程并行吃满所有核
+    if to_process:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = {executor.submit(_extract_one, str(p)): p for p in to_process}
+
+            for idx, future in enumerate(as_completed(futures), 1):
+                pdf_file = futures[future]
+                extract_result = future.result()
+                # 在加file_path等运行时字段之前入缓存，缓存里只存纯提取结果
+                cache_conn.execute(
+                    'INSERT OR REPLACE INTO extract_cache VALUES (?, ?)',
+                    (_cache_key(str(pdf_file)), pickle.dumps(extract_result))
+                )
+                extract_result['file_path'] = str(pdf_file)
+                extract_result['file_name'] = pdf_file.name
+                print(f"[{idx}/{len(to_process)}] 提取: {pdf_file.name}")
+                extracted[str(pdf_file)] = extract_result
+        cache_conn.commit()
+    cache_conn.close()
+
+    # as_completed的完成顺序不确定，按文件顺序排回去方便和目录对照
+    batch_results = [extracted[str(p)] for p in pdf_files]
+
+    # ===== 阶段2: 批量匹配影响因子 =====
+    print("\n匹配影响因子...\n")
+    journal_df = load_journal_database()
+    _match_batch(batch_results, journal_df)
+
+    for batch_result in batch_results:
+        print(f"文件: {batch_result['file_name']}")
         if batch_result['status'] == 'success':
             print(f"  ✓ 期刊: {batch_result['matched_journal_name']}")
             print(f"  ✓ IF: {batch_result['impact_factor']}")
@@ -335,48 +707,86 @@ def batch_process_pdfs(pdf_directory: str, journal_df: pd.DataFrame = None,
             print(f"  ✗ 未找到: {batch_result.get('extracted_journal_name', 'N/A')}")
         else:
             print(f"  ✗ 错误: {batch_result['message']}")
-
-        batch_results.append(batch_result)
         print()
 
     return batch_results
 
 
-def save_results_to_excel(results: List[Dict], output_path: str = None):
+def _result_row(save_result: Dict) -> Dict:
     """
-    将处理结果保存为Excel文件
+    把单条处理结果整理成输出表的一行
+
+    Args:
+        save_result: 单条处理结果
+
+    Returns:
+        列名到值的字典
+    """
+    # 缺失值用None而不是''：否则相似度一列混着float和空串，
+    # arrow推断不出列类型，写parquet直接报错；None会变成可空列
+    return {
+        '文件名': save_result.get('file_name'),
+        '文件路径': save_result.get('file_path'),
+        '状态': save_result.get('status'),
+        '提取的期刊名': save_result.get('extracted_journal_name'),
+        '匹配的期刊名': save_result.get('matched_journal_name'),
+        '影响因子': save_result.get('impact_factor'),
+        '匹配类型': save_result.get('match_type'),
+        '相似度': save_result.get('similarity'),
+        '错误信息': save_result.get('message')
+    }
+
+
+def save_results(results: List[Dict], output_path: str = None):
+    """
+    将处理结果保存到文件，按扩展名选择格式
+
+    .csv逐行流式写出（内存占用恒定，几万条也不怕），.parquet走二进制列存，
+    其余按xlsx处理，直接用xlsxwriter按行写出（constant_memory模式），比
+    openpyxl攒整棵XML DOM省内存也快不少
 
     Args:
         results: 处理结果列表
-        output_path: 输出文件路径（可选）
+        output_path: 输出文件路径（可选，扩展名决定格式）
     """
     if not results:
         print("没有结果可保存")
         return
 
-    # 准备数据
-    data = []
-    for save_result in results:
-        data.append({
-            '文件名': save_result.get('file_name', ''),
-            '文件路径': save_result.get('file_path', ''),
-            '状态': save_result.get('status', ''),
-            '提取的期刊名': save_result.get('extracted_journal_name', ''),
-            '匹配的期刊名': save_result.get('matched_journal_name', ''),
-            '影响因子': save_result.get('impact_factor', ''),
-            '匹配类型': save_result.get('match_type', ''),
-            '相似度': save_result.get('similarity', ''),
-            '错误信息': save_result.get('message', '')
-        })
-
-    df = pd.DataFrame(data)
-
     # 生成默认文件名
     if output_path is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_path = f"journal_impact_factors_{timestamp}.xlsx"
 
-    df.to_excel(output_path, index=False)
+    suffix = Path(output_path).suffix.lower()
+
+    if suffix == '.csv':
+        # utf-8-sig让Excel直接打开也不乱码
+        with open(output_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = None
+            for save_result in results:
+                row = _result_row(save_result)
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=row.keys())
+                    writer.writeheader()
+                writer.writerow(row)
+    elif suffix == '.parquet':
+        pd.DataFrame([_result_row(r) for r in results]).to_parquet(output_path)
+    else:
+        # 不能走to_excel：pandas按列的顺序生成单元格，而constant_memory模式
+        # 逐行刷盘，写回已刷掉的行会被静默丢弃。这里自己逐行写出，顺序天然正确
+        with xlsxwriter.Workbook(output_path,
+                                 {'constant_memory': True}) as workbook:
+            worksheet = workbook.add_worksheet()
+            header = None
+            for row_num, save_result in enumerate(results, start=1):
+                row = _result_row(save_result)
+                if header is None:
+                    header = list(row.keys())
+                    worksheet.write_row(0, 0, header)
+                worksheet.write_row(row_num, 0,
+                                    [row[key] for key in header])
+
     print(f"\n结果已保存到: {output_path}")
 
 
@@ -440,4 +850,4 @@ if __name__ == "__main__":
     print_summary(results)
 
     # 使用指定的输出文件名
-    save_results_to_excel(results, OUTPUT_FILE)
\ No newline at end of file
+    save_results(results, OUTPUT_FILE)
\ No newline at end of file